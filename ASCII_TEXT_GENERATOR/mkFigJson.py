@@ -1,21 +1,286 @@
-import os 
-
-fontNames = []
-
-# loop through all the files in the public/fonts directory
-for file in os.listdir("public/fonts"):
-    if file.endswith(".flf" or ".flc"):
-        # get the font name
-        fontName = file.split(".")[0]
-        # add the font name to the list
-        fontNames.append(fontName)
-        
-# create the json file
-with open("public/fonts.json", "w") as f:
-    f.write("{\n")
-    f.write("\t\"fonts\": [\n")
-    for font in fontNames:
-        f.write("\t\t\"" + font + "\",\n")
-    f.write("\t]\n")
-    f.write("}")
-    f.close()
\ No newline at end of file
+import os
+import re
+import sys
+import json
+import zipfile
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FONTS_DIR = os.path.join(BASE_DIR, "public", "fonts")
+BUNDLE_DIR = os.path.join(BASE_DIR, "public", "fontbundles")
+INDEX_FILE = os.path.join(BUNDLE_DIR, "index.json")
+CACHE_FILE = os.path.join(BASE_DIR, ".fontcache.json")
+
+FONT_EXTENSIONS = (".flf", ".tlf")
+CONTROL_EXTENSIONS = (".flc",)
+INDEX_VERSION = 1
+
+# <font name>.<content hash>.json; anything else in BUNDLE_DIR (index, previews) is left alone
+BUNDLE_NAME = re.compile(r".+\.[0-9a-f]{12}\.json$")
+
+# the 95 printable ASCII characters followed by the 7 required Deutsch characters
+REQUIRED_CODES = list(range(32, 127)) + [196, 214, 220, 228, 246, 252, 223]
+
+
+class FontError(Exception):
+    pass
+
+
+def read_font_file(path):
+    # toilet fonts (and some figlet fonts) are shipped as single-member zip archives
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            data = archive.read(archive.namelist()[0])
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def parse_code(token):
+    negative = token.startswith("-")
+    if negative:
+        token = token[1:]
+    if token[:2] in ("0x", "0X"):
+        value = int(token[2:], 16)
+    elif len(token) > 1 and token.startswith("0"):
+        value = int(token[1:], 8)
+    else:
+        value = int(token)
+    return -value if negative else value
+
+
+def strip_endmarks(lines):
+    stripped = []
+    for line in lines:
+        line = line.rstrip()
+        if line:
+            # the endmark is the last character, doubled on a glyph's final row
+            endmark = line[-1]
+            line = line[:-2] if line.endswith(endmark * 2) else line[:-1]
+        stripped.append(line)
+    return stripped
+
+
+def layout_from_header(old_layout, full_layout):
+    if full_layout is not None:
+        return full_layout
+    if old_layout == -1:
+        return 0
+    if old_layout == 0:
+        return 64
+    return (old_layout & 31) | 128
+
+
+def parse_font(text):
+    lines = text.splitlines()
+    if not lines:
+        raise FontError("empty font file")
+    header = lines[0].split()
+    signature = header[0]
+    if not (signature.startswith("flf2a") or signature.startswith("tlf2a")):
+        raise FontError(f"bad signature {signature[:5]!r}")
+    hardblank = signature[5] if len(signature) > 5 else " "
+    params = []
+    # some fonts carry free text after the numeric fields; stop at the first non-number
+    for value in header[1:]:
+        try:
+            params.append(int(value))
+        except ValueError:
+            break
+    if len(params) < 5:
+        raise FontError("header is missing parameters")
+
+    height, baseline, max_length, old_layout, comment_lines = params[:5]
+    print_direction = params[5] if len(params) > 5 else 0
+    full_layout = params[6] if len(params) > 6 else None
+    if height < 1:
+        raise FontError(f"invalid height {height}")
+
+    glyphs = {}
+    pos = 1 + comment_lines
+    for code in REQUIRED_CODES:
+        rows = lines[pos:pos + height]
+        if len(rows) < height:
+            break
+        glyphs[code] = strip_endmarks(rows)
+        pos += height
+
+    while pos < len(lines):
+        tag = lines[pos].split()
+        pos += 1
+        if not tag:
+            continue
+        try:
+            code = parse_code(tag[0])
+        except ValueError:
+            break
+        rows = lines[pos:pos + height]
+        if len(rows) < height:
+            break
+        # -1 is reserved by the spec and never names a real character
+        if code != -1:
+            glyphs[code] = strip_endmarks(rows)
+        pos += height
+
+    if 32 not in glyphs:
+        raise FontError("font has no glyphs")
+
+    return {
+        "height": height,
+        "baseline": baseline,
+        "hardBlank": hardblank,
+        "maxLength": max_length,
+        "oldLayout": old_layout,
+        "fullLayout": layout_from_header(old_layout, full_layout),
+        "printDirection": print_direction,
+        "glyphs": glyphs,
+    }
+
+
+def source_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_bundle(name, path):
+    font = parse_font(read_font_file(path))
+    glyphs = font.pop("glyphs")
+    bundle = dict(name=name, **font)
+    bundle["glyphs"] = {str(code): rows for code, rows in sorted(glyphs.items())}
+    payload = json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(payload).hexdigest()[:12]
+    file_name = f"{name}.{digest}.json"
+    with open(os.path.join(BUNDLE_DIR, file_name), "wb") as f:
+        f.write(payload)
+
+    entry = dict(name=name, file=file_name, **font)
+    entry["glyphCount"] = len(glyphs)
+    entry["size"] = len(payload)
+    return entry
+
+
+def build_one(job):
+    name, path = job
+    try:
+        return name, build_bundle(name, path), None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+
+
+def load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != INDEX_VERSION:
+        return {}
+    return cache.get("files", {})
+
+
+def save_cache(files):
+    tmp = CACHE_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": INDEX_VERSION, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp, CACHE_FILE)
+
+
+def scan_fonts():
+    fonts, controls = {}, []
+    for file in sorted(os.listdir(FONTS_DIR)):
+        base, ext = os.path.splitext(file)
+        ext = ext.lower()
+        if ext in FONT_EXTENSIONS:
+            # prefer the .flf when a font ships in both formats
+            if base not in fonts or ext == ".flf":
+                fonts[base] = file
+        elif ext in CONTROL_EXTENSIONS:
+            controls.append(base)
+    return fonts, controls
+
+
+def is_fresh(cached, stat, digest=None):
+    if not cached or not os.path.exists(os.path.join(BUNDLE_DIR, cached["entry"]["file"])):
+        return False
+    if digest is not None:
+        return cached["sha"] == digest
+    return cached["mtime"] == stat.st_mtime_ns and cached["size"] == stat.st_size
+
+
+def main(force=False, strict=False, workers=None):
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    fonts, controls = scan_fonts()
+    cache = {} if force else load_cache()
+
+    entries, new_cache, jobs, stats, digests = {}, {}, [], {}, {}
+    reused = 0
+    for name, file in fonts.items():
+        path = os.path.join(FONTS_DIR, file)
+        stat = os.stat(path)
+        stats[name] = stat
+        cached = cache.get(file)
+        if is_fresh(cached, stat):
+            entries[name] = cached["entry"]
+            new_cache[file] = cached
+            reused += 1
+            continue
+        # mtime changed (fresh checkout, touch): fall back to comparing content
+        digest = source_digest(path)
+        if is_fresh(cached, stat, digest):
+            entries[name] = cached["entry"]
+            new_cache[file] = dict(cached, mtime=stat.st_mtime_ns, size=stat.st_size)
+            reused += 1
+            continue
+        digests[name] = digest
+        jobs.append((name, path))
+
+    failed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, entry, error in pool.map(build_one, jobs, chunksize=4):
+                if error:
+                    failed.append((name, error))
+                    continue
+                file = fonts[name]
+                entries[name] = entry
+                new_cache[file] = {
+                    "mtime": stats[name].st_mtime_ns,
+                    "size": stats[name].st_size,
+                    "sha": digests[name],
+                    "entry": entry,
+                }
+
+    index = {
+        "version": INDEX_VERSION,
+        "fonts": [entries[name] for name in sorted(entries, key=str.lower)],
+        "controls": sorted(controls, key=str.lower),
+    }
+    tmp = INDEX_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, INDEX_FILE)
+    save_cache(new_cache)
+
+    # drop bundles left behind by fonts that changed or were removed
+    live = {entry["file"] for entry in entries.values()}
+    for file in os.listdir(BUNDLE_DIR):
+        if BUNDLE_NAME.match(file) and file not in live:
+            os.remove(os.path.join(BUNDLE_DIR, file))
+
+    print(f"{len(entries)} fonts indexed, {len(jobs) - len(failed)} rebuilt, {reused} unchanged")
+    for name, error in failed:
+        print(f"skipped {name}: {error}", file=sys.stderr)
+    # a bad font is already left out of the index; only --strict turns it into a failed build
+    return 1 if strict and failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(force="--force" in sys.argv, strict="--strict" in sys.argv))
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import gzip
+from concurrent.futures import ProcessPoolExecutor
+
+from mkFigJson import FONTS_DIR, BUNDLE_DIR, scan_fonts, read_font_file, parse_font
+
+# static hosts (snowpack dev, gh-pages) serve .gz as application/gzip without Content-Encoding,
+# so the page fetches the plain file and lets the host compress it in transit; the .gz copy
+# is for clients that decompress it themselves with DecompressionStream("gzip")
+PREVIEW_FILE = os.path.join(BUNDLE_DIR, "previews.json")
+PREVIEW_GZ_FILE = PREVIEW_FILE + ".gz"
+PREVIEW_TEXT = "Hello"
+MAX_WIDTH = 80
+MANIFEST_VERSION = 1
+
+SMUSH_EQUAL = 1
+SMUSH_LOWLINE = 2
+SMUSH_HIERARCHY = 4
+SMUSH_PAIR = 8
+SMUSH_BIGX = 16
+SMUSH_HARDBLANK = 32
+LAYOUT_KERN = 64
+LAYOUT_SMUSH = 128
+
+HIERARCHY = ["|", "/\\", "[]", "{}", "()", "<>"]
+PAIRS = {"[]", "][", "{}", "}{", "()", ")("}
+BIG_X = {"/\\": "|", "\\/": "Y", "><": "X"}
+
+# parsed fonts live for the lifetime of a worker so each file is read and parsed once
+_fonts = {}
+
+
+def load_font(file):
+    font = _fonts.get(file)
+    if font is None:
+        font = parse_font(read_font_file(os.path.join(FONTS_DIR, file)))
+        # pad every glyph to a rectangle so columns line up while smushing
+        for code, rows in font["glyphs"].items():
+            width = max((len(row) for row in rows), default=0)
+            font["glyphs"][code] = [row.ljust(width) for row in rows]
+        _fonts[file] = font
+    return font
+
+
+def hierarchy_class(ch):
+    for level, members in enumerate(HIERARCHY):
+        if ch in members:
+            return level
+    return None
+
+
+def smush_chars(left, right, layout, hardblank, left_width, right_width):
+    if left == " ":
+        return right
+    if right == " ":
+        return left
+    if left_width < 2 or right_width < 2:
+        return None
+    if not layout & LAYOUT_SMUSH:
+        return None
+
+    if layout & 63 == 0:
+        # universal smushing: the later character wins, visible beats hardblank
+        if left == hardblank:
+            return right
+        return right if right != hardblank else left
+
+    if layout & SMUSH_HARDBLANK and left == hardblank and right == hardblank:
+        return left
+    if left == hardblank or right == hardblank:
+        return None
+    if layout & SMUSH_EQUAL and left == right:
+        return left
+    if layout & SMUSH_LOWLINE:
+        if left == "_" and right in "|/\\[]{}()<>":
+            return right
+        if right == "_" and left in "|/\\[]{}()<>":
+            return left
+    if layout & SMUSH_HIERARCHY:
+        left_class, right_class = hierarchy_class(left), hierarchy_class(right)
+        if left_class is not None and right_class is not None and left_class != right_class:
+            return right if right_class > left_class else left
+    if layout & SMUSH_PAIR and left + right in PAIRS:
+        return "|"
+    if layout & SMUSH_BIGX and left + right in BIG_X:
+        return BIG_X[left + right]
+    return None
+
+
+def smush_amount(lines, glyph, layout, hardblank, prev_width):
+    if not layout & (LAYOUT_KERN | LAYOUT_SMUSH):
+        return 0
+    width = len(glyph[0]) if glyph else 0
+    amount = width
+    for line, row in zip(lines, glyph):
+        trimmed = line.rstrip(" ")
+        left_pos = len(trimmed) - 1
+        right_pos = len(row) - len(row.lstrip(" "))
+        gap = right_pos + len(line) - 1 - max(left_pos, 0)
+        if left_pos < 0:
+            gap += 1
+        elif right_pos < len(row) and smush_chars(trimmed[-1], row[right_pos], layout, hardblank, prev_width, width) is not None:
+            gap += 1
+        amount = min(amount, gap)
+    return max(amount, 0)
+
+
+def render(font, text):
+    height, hardblank, layout = font["height"], font["hardBlank"], font["fullLayout"]
+    lines = [""] * height
+    prev_width = 0
+    missing = set()
+    for ch in text:
+        glyph = font["glyphs"].get(ord(ch))
+        if glyph is None:
+            missing.add(ch)
+            continue
+        width = len(glyph[0]) if glyph else 0
+        amount = min(smush_amount(lines, glyph, layout, hardblank, prev_width), len(lines[0]))
+        for row in range(height):
+            line, part = lines[row], glyph[row]
+            start = len(line) - amount
+            merged = "".join(
+                smush_chars(line[start + k], part[k], layout, hardblank, prev_width, width) or part[k]
+                for k in range(amount)
+            )
+            lines[row] = line[:start] + merged + part[amount:]
+        prev_width = width
+    art = [line.replace(hardblank, " ").rstrip() for line in lines]
+    return art, missing
+
+
+def render_font(job):
+    name, file, text, max_width = job
+    try:
+        font = load_font(file)
+        art, missing = render(font, text)
+    except Exception as e:
+        return name, None, [f"unrenderable: {type(e).__name__}: {e}"]
+
+    flags = []
+    width = max((len(line) for line in art), default=0)
+    if missing:
+        flags.append("missing glyphs: " + "".join(sorted(missing)))
+    if width == 0:
+        flags.append("empty output")
+    elif width > max_width:
+        flags.append(f"too wide: {width} columns")
+    # drop the blank descender rows most fonts pad below the letters
+    while art and not art[-1]:
+        art.pop()
+    preview = {"width": width, "height": len(art), "art": "\n".join(art)}
+    return name, preview, flags
+
+
+def main(text=PREVIEW_TEXT, max_width=MAX_WIDTH, workers=None):
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    fonts, _ = scan_fonts()
+    jobs = [(name, file, text, max_width) for name, file in fonts.items()]
+
+    previews, flagged = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, preview, flags in pool.map(render_font, jobs, chunksize=8):
+            if preview is not None:
+                previews[name] = preview
+            if flags:
+                flagged[name] = flags
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "text": text,
+        "maxWidth": max_width,
+        "previews": {name: previews[name] for name in sorted(previews, key=str.lower)},
+        "flagged": {name: flagged[name] for name in sorted(flagged, key=str.lower)},
+    }
+    payload = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # mtime=0 keeps the archive byte-identical across runs with the same input
+    for path, data in ((PREVIEW_FILE, payload), (PREVIEW_GZ_FILE, gzip.compress(payload, compresslevel=9, mtime=0))):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    print(f"{len(previews)} previews rendered, {len(flagged)} flagged, {len(payload)} bytes ({os.path.getsize(PREVIEW_GZ_FILE)} gzipped)")
+    for name, flags in manifest["flagged"].items():
+        print(f"{name}: {'; '.join(flags)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(" ".join(sys.argv[1:]) or PREVIEW_TEXT))
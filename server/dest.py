@@ -6,27 +6,49 @@ import threading
 import socket
 import shutil
 import json
+import asyncio
 
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
 console = Console()
 
-results = {
-    "domain": "",
-    "port": None,
-    "tls_supported": False,
-    "http2_supported": False,
-    "cdn_used": False,
-    "redirect_found": False,
-    "ping": None,
-    "rating": 0,
-    "cdn_provider": None,
-    "cdns": [],
-    "negatives": [],
-    "positives": [],
+def new_results():
+    return {
+        "domain": "",
+        "port": None,
+        "tls_supported": False,
+        "http2_supported": False,
+        "cdn_used": False,
+        "redirect_found": False,
+        "ping": None,
+        "rating": 0,
+        "cdn_provider": None,
+        "cdns": [],
+        "negatives": [],
+        "positives": [],
+        "families": {},
+        "recommended_family": None,
+    }
+
+FAMILIES = {
+    "ipv6": socket.AF_INET6,
+    "ipv4": socket.AF_INET,
+}
+
+FAMILY_FLAGS = {
+    "ipv6": "-6",
+    "ipv4": "-4",
 }
 
+FAMILY_NAMES = {
+    "ipv6": "IPv6",
+    "ipv4": "IPv4",
+}
+
+# RFC 8305 connection attempt delay: IPv6 gets a head start before IPv4 is tried
+HAPPY_EYEBALLS_DELAY = 0.25
+
 def check_and_install_command(command_name):
     if shutil.which(command_name) is None:
         console.print(f"[yellow]Utility {command_name} not found. Installing...[/yellow]")
@@ -40,29 +62,98 @@ def check_and_install_command(command_name):
             console.print(f"[red]Error: failed to install {command_name}. Please install manually.[/red]")
             sys.exit(1)
 
-def check_port_availability(domain, port, timeout=5):
+def resolve_families(domain):
+    families = {}
+    for family, af in FAMILIES.items():
+        try:
+            infos = socket.getaddrinfo(domain, None, af, socket.SOCK_STREAM)
+        except socket.gaierror:
+            continue
+        addresses = []
+        for info in infos:
+            address = info[4][0]
+            if address not in addresses:
+                addresses.append(address)
+        if addresses:
+            families[family] = {
+                "addresses": addresses,
+                "connect_ms": None,
+                "tls_supported": None,
+                "ping": None,
+            }
+    return families
+
+def run_per_family(results, probe, delay=0):
+    # start one probe per resolved family, IPv6 first, each later family after `delay`
+    found = {}
+    errors = []
+    threads = []
+    for family in results["families"]:
+        def worker(family=family):
+            try:
+                found[family] = probe(family)
+            except Exception as e:
+                found[family] = None
+                errors.append(e)
+        t = threading.Thread(target=worker)
+        threads.append(t)
+        t.start()
+        if delay:
+            time.sleep(delay)
+    for t in threads:
+        t.join()
+    # a failed family just has no result; only when every family failed (e.g. a missing
+    # binary) is the error passed on to the calling check's error handling
+    if errors and len(errors) == len(threads):
+        raise errors[0]
+    return found
+
+def connect_family(results, family, port, timeout):
+    for address in results["families"][family]["addresses"]:
+        start = time.monotonic()
+        try:
+            with socket.create_connection((address, port), timeout=timeout):
+                return round((time.monotonic() - start) * 1000, 1)
+        except OSError:
+            continue
+    return None
+
+def check_port_availability(results, domain, port, timeout=5):
+    connected = run_per_family(results, lambda family: connect_family(results, family, port, timeout), delay=HAPPY_EYEBALLS_DELAY)
+    for family, connect_ms in connected.items():
+        results["families"][family]["connect_ms"] = connect_ms
+    return any(connect_ms is not None for connect_ms in connected.values())
+
+def probe_tls13(domain, port, family):
     try:
-        with socket.create_connection((domain, port), timeout=timeout):
-            return True
-    except:
-        return False
-
-def check_tls(domain, port, progress, task_id):
-    try:
-        progress.update(task_id, description="Checking TLS 1.3 support...")
         proc = subprocess.run(
-            ["openssl", "s_client", "-connect", f"{domain}:{port}", "-tls1_3"],
+            ["openssl", "s_client", FAMILY_FLAGS[family], "-connect", f"{domain}:{port}", "-tls1_3"],
             input="",
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             timeout=10,
             text=True,
         )
-        output = proc.stdout + proc.stderr
-        if proc.returncode == 0 and ("TLSv1.3" in output or "New, TLSv1.3" in output):
+    except subprocess.TimeoutExpired:
+        return None
+    output = proc.stdout + proc.stderr
+    return proc.returncode == 0 and ("TLSv1.3" in output or "New, TLSv1.3" in output)
+
+def check_tls(results, domain, port, progress, task_id):
+    try:
+        progress.update(task_id, description="Checking TLS 1.3 support...")
+        supported = run_per_family(results, lambda family: probe_tls13(domain, port, family))
+        for family, tls_supported in supported.items():
+            results["families"][family]["tls_supported"] = tls_supported
+        if all(ok is None for ok in supported.values()):
+            results["negatives"].append("Failed to connect for TLS check")
+            progress.update(task_id, description="[red]Error during TLS check[/red]", completed=1)
+            return
+        tls_families = [FAMILY_NAMES[family] for family, ok in supported.items() if ok]
+        if tls_families:
             results["tls_supported"] = True
             results["positives"].append("TLS 1.3 supported")
-            progress.update(task_id, description="[green]TLS 1.3 supported[/green]", completed=1)
+            progress.update(task_id, description=f"[green]TLS 1.3 supported[/green] ({', '.join(tls_families)})", completed=1)
         else:
             proc = subprocess.run(
                 ["openssl", "s_client", "-connect", f"{domain}:{port}"],
@@ -91,7 +182,7 @@ def check_tls(domain, port, progress, task_id):
         results["negatives"].append(f"Error during TLS check: {e}")
         progress.update(task_id, description="[red]Error during TLS check[/red]", completed=1)
 
-def check_http2(domain, port, progress, task_id):
+def check_http2(results, domain, port, progress, task_id):
     try:
         progress.update(task_id, description="Checking HTTP/2 support...")
         proc = subprocess.run(
@@ -128,7 +219,7 @@ def check_http2(domain, port, progress, task_id):
         results["negatives"].append(f"Error during HTTP/2 check: {e}")
         progress.update(task_id, description="[red]Error during HTTP/2 check[/red]", completed=1)
 
-def check_cdn(domain, port, progress, task_id):
+def check_cdn(results, domain, port, progress, task_id):
     cdn_providers = {
         "cloudflare": "Cloudflare",
         "akamai": "Akamai",
@@ -167,7 +258,7 @@ def check_cdn(domain, port, progress, task_id):
         results["negatives"].append(f"Error during CDN check: {e}")
         progress.update(task_id, description="[red]Error during CDN check[/red]", completed=1)
 
-def check_redirect(domain, port, progress, task_id):
+def check_redirect(results, domain, port, progress, task_id):
     try:
         progress.update(task_id, description="Checking for redirects...")
         response = requests.get(f"https://{domain}:{port}", timeout=5, allow_redirects=False)
@@ -182,41 +273,34 @@ def check_redirect(domain, port, progress, task_id):
         results["negatives"].append(f"Error during redirect check: {e}")
         progress.update(task_id, description="[red]Error during redirect check[/red]", completed=1)
 
-def calculate_ping(domain, progress, task_id):
+def ping_family(domain, family):
     try:
-        progress.update(task_id, description="Calculating ping...")
         proc = subprocess.run(
-            ["ping", "-c", "5", domain],
+            ["ping", FAMILY_FLAGS[family], "-c", "5", domain],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             timeout=10,
             text=True,
         )
-        if proc.returncode == 0:
-            for line in proc.stdout.split("\n"):
-                if "rtt min/avg/max/mdev" in line:
-                    avg_ping = line.split("/")[4]
-                    results["ping"] = float(avg_ping)
-                    break
-            if results["ping"] is not None:
-                if results["ping"] <= 2:
-                    results["rating"] = 5
-                elif results["ping"] <= 3:
-                    results["rating"] = 4
-                elif results["ping"] <= 5:
-                    results["rating"] = 3
-                elif results["ping"] <= 8:
-                    results["rating"] = 2
-                else:
-                    results["rating"] = 1
-                if results["rating"] >= 4:
-                    results["positives"].append(f"Average ping: {results['ping']} ms (Rating: {results['rating']}/5)")
-                else:
-                    results["negatives"].append(f"High ping: {results['ping']} ms (Rating: {results['rating']}/5)")
-                progress.update(task_id, description=f"Ping calculation... [green]{results['ping']} ms[/green]", completed=1)
-            else:
-                results["negatives"].append("Could not determine average ping")
-                progress.update(task_id, description="[red]Could not determine average ping[/red]", completed=1)
+    except subprocess.TimeoutExpired:
+        return None
+    if proc.returncode != 0:
+        return None
+    for line in proc.stdout.split("\n"):
+        if "rtt min/avg/max/mdev" in line:
+            return float(line.split("/")[4])
+    return None
+
+def calculate_ping(results, domain, progress, task_id):
+    try:
+        progress.update(task_id, description="Calculating ping...")
+        pings = run_per_family(results, lambda family: ping_family(domain, family))
+        for family, ping in pings.items():
+            results["families"][family]["ping"] = ping
+        measured = {family: ping for family, ping in pings.items() if ping is not None}
+        if measured:
+            per_family = ", ".join(f"{FAMILY_NAMES[family]} {ping} ms" for family, ping in measured.items())
+            progress.update(task_id, description=f"Ping calculation... [green]{per_family}[/green]", completed=1)
         else:
             results["negatives"].append("Failed to ping the host")
             progress.update(task_id, description="[red]Failed to ping host[/red]", completed=1)
@@ -224,8 +308,77 @@ def calculate_ping(domain, progress, task_id):
         results["negatives"].append(f"Error during ping calculation: {e}")
         progress.update(task_id, description="[red]Error during ping calculation[/red]", completed=1)
 
-def display_results():
-    console.print("\n[bold cyan]===== Check Results =====[/bold cyan]\n")
+def family_verdict(results, family):
+    info = results["families"][family]
+    return info["connect_ms"] is not None and bool(info["tls_supported"])
+
+def recommend_family(results):
+    # rank on TCP connect time, which every suitable family has; ICMP is often
+    # filtered on only one family, so ping would compare unlike numbers
+    candidates = []
+    for family in results["families"]:
+        if family_verdict(results, family):
+            candidates.append((results["families"][family]["connect_ms"], family))
+    if not candidates:
+        return None
+    return min(candidates)[1]
+
+def rate_ping(results):
+    # the overall ping must come from a family the dest actually works over:
+    # the recommended one, else any family that accepted the connection
+    family = results["recommended_family"]
+    ping = results["families"][family]["ping"] if family else None
+    if ping is None:
+        connected = [info["ping"] for info in results["families"].values() if info["connect_ms"] is not None and info["ping"] is not None]
+        ping = min(connected) if connected else None
+    if ping is None:
+        if any(info["ping"] is not None for info in results["families"].values()):
+            results["negatives"].append("No ping from an address family that accepts connections")
+        return
+
+    results["ping"] = ping
+    if results["ping"] <= 2:
+        results["rating"] = 5
+    elif results["ping"] <= 3:
+        results["rating"] = 4
+    elif results["ping"] <= 5:
+        results["rating"] = 3
+    elif results["ping"] <= 8:
+        results["rating"] = 2
+    else:
+        results["rating"] = 1
+    if results["rating"] >= 4:
+        results["positives"].append(f"Average ping: {results['ping']} ms (Rating: {results['rating']}/5)")
+    else:
+        results["negatives"].append(f"High ping: {results['ping']} ms (Rating: {results['rating']}/5)")
+
+def display_families(results):
+    console.print("\n[bold cyan]===== Address Families =====[/bold cyan]\n")
+    for family in FAMILIES:
+        name = FAMILY_NAMES[family]
+        info = results["families"].get(family)
+        if info is None:
+            console.print(f"[yellow]{name}: no records[/yellow]")
+            continue
+        suitable = family_verdict(results, family)
+        connect = f"{info['connect_ms']} ms" if info["connect_ms"] is not None else "failed"
+        tls = {True: "yes", False: "no", None: "unknown"}[info["tls_supported"]]
+        ping = f"{info['ping']} ms" if info["ping"] is not None else "n/a"
+        color = "green" if suitable else "red"
+        verdict = "OK" if suitable else "NOT OK"
+        console.print(f"[{color}]{name}: {verdict}[/{color}] ({', '.join(info['addresses'])})")
+        console.print(f"  connect: {connect}, TLS 1.3: {tls}, ping: {ping}")
+
+    family = results["recommended_family"]
+    if family:
+        address = results["families"][family]["addresses"][0]
+        if ":" in address:
+            address = f"[{address}]"
+        console.print(f"\n[bold green]Recommended family for dest: {FAMILY_NAMES[family]} ({address}:{results['port']})[/bold green]")
+    else:
+        console.print("\n[bold red]No address family is suitable for dest[/bold red]")
+
+def evaluate(results):
     reasons = []
     positives = []
 
@@ -269,6 +422,12 @@ def display_results():
     else:
         acceptable = False
 
+    return acceptable, reasons, positives
+
+def display_results(results):
+    console.print("\n[bold cyan]===== Check Results =====[/bold cyan]\n")
+    acceptable, reasons, positives = evaluate(results)
+
     if acceptable:
         console.print("[bold green]Site is suitable for DEST for Reality for the following reasons:[/bold green]")
         for positive in positives:
@@ -288,16 +447,84 @@ def display_results():
     else:
         console.print(f"\n[bold red]Host {results['domain']}:{port_display} is NOT suitable as dest[/bold red]")
 
-def main(domain_input):
+class SilentProgress:
+    # stands in for rich's Progress when checks run without a terminal (probe(), dest_service.py)
+    def add_task(self, description, total=None):
+        return None
+
+    def update(self, task_id, **kwargs):
+        pass
+
+def parse_target(domain_input):
     if ':' in domain_input:
         domain, port = domain_input.split(':', 1)
-        port = int(port)
+        return domain, int(port)
+    return domain_input, None
+
+def run_checks(results, domain, port, progress):
+    tasks = {}
+    tasks['tls'] = progress.add_task("Checking TLS 1.3 support...", total=1)
+    tasks['http2'] = progress.add_task("Checking HTTP/2 support...", total=1)
+    tasks['cdn'] = progress.add_task("Checking for CDN...", total=1)
+    tasks['redirect'] = progress.add_task("Checking for redirects...", total=1)
+    tasks['ping'] = progress.add_task("Calculating ping...", total=1)
+
+    threads = []
+
+    t_tls = threading.Thread(target=check_tls, args=(results, domain, port, progress, tasks['tls']))
+    t_http2 = threading.Thread(target=check_http2, args=(results, domain, port, progress, tasks['http2']))
+    t_cdn = threading.Thread(target=check_cdn, args=(results, domain, port, progress, tasks['cdn']))
+    t_redirect = threading.Thread(target=check_redirect, args=(results, domain, port, progress, tasks['redirect']))
+    t_ping = threading.Thread(target=calculate_ping, args=(results, domain, progress, tasks['ping']))
+
+    threads.extend([t_tls, t_http2, t_cdn, t_redirect, t_ping])
+
+    for t in threads:
+        t.start()
+        time.sleep(0.1)
+
+    for t in threads:
+        t.join()
+
+    results["recommended_family"] = recommend_family(results)
+    rate_ping(results)
+
+def probe(domain, port=None):
+    results = new_results()
+    results["domain"] = domain
+    results["port"] = port
+    results["families"] = resolve_families(domain)
+    results["acceptable"] = False
+
+    if not results["families"]:
+        results["negatives"].append("Could not resolve A or AAAA records")
+        return results
+
+    ports_to_check = [port] if port else [443, 80]
+    for port in ports_to_check:
+        if check_port_availability(results, domain, port):
+            results["port"] = port
+            break
     else:
-        domain = domain_input
-        port = None
+        results["negatives"].append(f"Host unavailable on ports {', '.join(map(str, ports_to_check))}")
+        return results
+
+    run_checks(results, domain, port, SilentProgress())
+    acceptable, reasons, positives = evaluate(results)
+    results["acceptable"] = acceptable
+    results["reasons"] = reasons
+    return results
+
+async def probe_async(domain, port=None):
+    return await asyncio.to_thread(probe, domain, port)
+
+def main(domain_input):
+    domain, port = parse_target(domain_input)
 
+    results = new_results()
     results["domain"] = domain
     results["port"] = port
+    results["families"] = resolve_families(domain)
 
     check_and_install_command("openssl")
     check_and_install_command("curl")
@@ -305,6 +532,11 @@ def main(domain_input):
     check_and_install_command("whois")
 
     console.print(f"\n[bold cyan]Checking host:[/bold cyan] {domain}")
+    if not results["families"]:
+        console.print(f"[red]Could not resolve A or AAAA records for {domain}[/red]")
+        sys.exit(1)
+    resolved = ", ".join(FAMILY_NAMES[family] for family in results["families"])
+    console.print(f"[bold cyan]Resolved families:[/bold cyan] {resolved}")
     if port:
         console.print(f"[bold cyan]Port:[/bold cyan] {port}")
         ports_to_check = [port]
@@ -313,7 +545,7 @@ def main(domain_input):
         ports_to_check = [443, 80]
 
     for port in ports_to_check:
-        if check_port_availability(domain, port):
+        if check_port_availability(results, domain, port):
             results["port"] = port
             console.print(f"[green]Port {port} available. Proceeding with check...[/green]")
             break
@@ -327,31 +559,10 @@ def main(domain_input):
         SpinnerColumn(finished_text=""),
         TextColumn("{task.description}"),
     ) as progress:
-        tasks = {}
-        tasks['tls'] = progress.add_task("Checking TLS 1.3 support...", total=1)
-        tasks['http2'] = progress.add_task("Checking HTTP/2 support...", total=1)
-        tasks['cdn'] = progress.add_task("Checking for CDN...", total=1)
-        tasks['redirect'] = progress.add_task("Checking for redirects...", total=1)
-        tasks['ping'] = progress.add_task("Calculating ping...", total=1)
-
-        threads = []
-
-        t_tls = threading.Thread(target=check_tls, args=(domain, port, progress, tasks['tls']))
-        t_http2 = threading.Thread(target=check_http2, args=(domain, port, progress, tasks['http2']))
-        t_cdn = threading.Thread(target=check_cdn, args=(domain, port, progress, tasks['cdn']))
-        t_redirect = threading.Thread(target=check_redirect, args=(domain, port, progress, tasks['redirect']))
-        t_ping = threading.Thread(target=calculate_ping, args=(domain, progress, tasks['ping']))
-
-        threads.extend([t_tls, t_http2, t_cdn, t_redirect, t_ping])
-
-        for t in threads:
-            t.start()
-            time.sleep(0.1)
-
-        for t in threads:
-            t.join()
+        run_checks(results, domain, port, progress)
 
-    display_results()
+    display_results(results)
+    display_families(results)
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -0,0 +1,189 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit, parse_qs
+
+import dest
+
+DEFAULT_LISTEN = "127.0.0.1:8765"
+DEFAULT_TTL = 300
+MAX_PROBES = 4
+MAX_ENTRIES = 1024
+REQUEST_TIMEOUT = 30
+DEFAULT_DEST_PORT = 443
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+def reached_port(result):
+    return any(info["connect_ms"] is not None for info in result["families"].values())
+
+class ProbeCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_probes=MAX_PROBES):
+        self.ttl = ttl
+        self.entries = {}
+        self.inflight = {}
+        # every probe forks openssl/curl/ping, so cap how many run at once
+        self.semaphore = asyncio.Semaphore(max_probes)
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "probes": 0, "errors": 0}
+
+    async def check(self, domain, port=None, max_age=None):
+        domain = domain.lower().rstrip(".")
+        key = (domain, port)
+        max_age = self.ttl if max_age is None else max_age
+
+        # a bare host is probed on 443 first, so a verdict that reached host:443 answers it too
+        lookups = [key] if port is not None else [key, (domain, DEFAULT_DEST_PORT)]
+        for lookup in lookups:
+            entry = self.entries.get(lookup)
+            if entry is None or (lookup != key and not reached_port(entry[1])):
+                continue
+            age = time.monotonic() - entry[0]
+            if age <= max_age:
+                self.stats["hits"] += 1
+                return entry[1], age
+
+        # single flight: everyone asking for the same host:port awaits one probe; a bare host
+        # and an explicit host:port only share a probe through the cache, since the port a bare
+        # host lands on is unknown until its probe finishes
+        future = self.inflight.get(key)
+        if future is None:
+            self.stats["misses"] += 1
+            future = asyncio.ensure_future(self._probe(key))
+            self.inflight[key] = future
+        else:
+            self.stats["coalesced"] += 1
+        # shield so a client hanging up does not cancel the probe for the other waiters
+        return await asyncio.shield(future), None
+
+    async def _probe(self, key):
+        try:
+            async with self.semaphore:
+                self.stats["probes"] += 1
+                result = await dest.probe_async(*key)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            del self.inflight[key]
+        self._store(key, result)
+        if key[1] is None and reached_port(result):
+            # also file a bare host's verdict under the port it was actually probed on
+            self._store((key[0], result["port"]), result)
+        return result
+
+    def _store(self, key, result):
+        now = time.monotonic()
+        if len(self.entries) >= MAX_ENTRIES:
+            for stale in [k for k, (stamp, _) in self.entries.items() if now - stamp > self.ttl]:
+                del self.entries[stale]
+        if len(self.entries) >= MAX_ENTRIES:
+            oldest = min(self.entries, key=lambda k: self.entries[k][0])
+            del self.entries[oldest]
+        self.entries[key] = (now, result)
+
+class ProbeService:
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def route(self, method, target):
+        if method != "GET":
+            return 405, {"error": "only GET is supported"}
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path == "/health":
+            return 200, {"status": "ok", "inflight": len(self.cache.inflight), "cached": len(self.cache.entries), **self.cache.stats}
+        if url.path != "/check":
+            return 404, {"error": f"unknown path {url.path}"}
+
+        host = query.get("host", [""])[0].strip()
+        if not host:
+            return 400, {"error": "missing host parameter, expected host=<domain[:port]>"}
+        try:
+            domain, port = dest.parse_target(host)
+        except ValueError:
+            return 400, {"error": f"invalid port in {host!r}"}
+        if port is not None and not 1 <= port <= 65535:
+            return 400, {"error": f"port out of range in {host!r}, expected 1-65535"}
+        max_age = 0 if query.get("fresh", ["0"])[0] == "1" else None
+
+        result, age = await self.cache.check(domain, port, max_age)
+        cached = age is not None
+        return 200, {"cached": cached, "age": round(age, 1) if cached else 0, "result": result}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip().lower()
+
+                if len(parts) != 3:
+                    status, body = 400, {"error": "malformed request line"}
+                else:
+                    try:
+                        status, body = await self.route(parts[0], parts[1])
+                    except Exception as e:
+                        status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                keep_alive = len(parts) == 3 and parts[2] == "HTTP/1.1" and headers.get("connection") != "close"
+                payload = json.dumps(body).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(listen=DEFAULT_LISTEN, socket_path=None, ttl=DEFAULT_TTL, max_probes=MAX_PROBES):
+    service = ProbeService(ProbeCache(ttl, max_probes))
+    if socket_path:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+        where = f"unix:{socket_path}"
+    else:
+        host, port = listen.rsplit(":", 1)
+        server = await asyncio.start_server(service.handle, host, int(port))
+        where = f"http://{listen}"
+    dest.console.print(f"[bold cyan]Dest probe service listening on {where}[/bold cyan]")
+    async with server:
+        await server.serve_forever()
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Serve dest.py checks over local HTTP with cached, coalesced probes.",
+        epilog="Example: curl 'http://127.0.0.1:8765/check?host=example.com:443'",
+    )
+    parser.add_argument("--listen", default=DEFAULT_LISTEN, help="host:port to bind (default %(default)s)")
+    parser.add_argument("--socket", help="serve on this Unix socket path instead of TCP")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="seconds a verdict stays fresh (default %(default)s)")
+    parser.add_argument("--max-probes", type=int, default=MAX_PROBES, help="probes allowed to run at once (default %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.listen, args.socket, args.ttl, args.max_probes))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])